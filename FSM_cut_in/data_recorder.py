@@ -7,12 +7,18 @@ class DataRecorder:
     def init_testing_log(self):
         self.testing_writer.writerow([
             "episode", "step", "bv_x", "bv_y", "bv_speed", "bv_heading", "bv_acceleration", "bv_steering",
-            "av_x", "av_y", "av_speed", "ttc_lon", "crash", "distance"
+            "av_x", "av_y", "av_speed", "ttc_lon", "crash", "distance",
+            "scenario_distance", "scenario_bv_speed", "scenario_av_speed", "scenario_lane_offset"
         ])
 
     def record_testing_data(self, episode, step, bv_x, bv_y, bv_speed, bv_heading, bv_acceleration, bv_steering,
-                            av_x, av_y, av_speed, ttc_lon, crash, distance):
+                            av_x, av_y, av_speed, ttc_lon, crash, distance, scenario=None):
+        # Sampled scenario (env.current_sample), left empty when not given
+        if scenario is None:
+            scenario_row = ["", "", "", ""]
+        else:
+            scenario_row = [scenario['distance'], scenario['bv_speed'], scenario['av_speed'], scenario['lane_offset']]
         self.testing_writer.writerow([
             episode, step, bv_x, bv_y, bv_speed, bv_heading, bv_acceleration, bv_steering, av_x, av_y, av_speed,
-            ttc_lon, crash, distance
+            ttc_lon, crash, distance, *scenario_row
         ])
@@ -0,0 +1,310 @@
+"""A surrogate outcome model used to pre-screen cut-in scenarios before full simulation."""
+
+import numpy as np
+import pandas as pd
+from FSM_based_cut_in_vehicle import SmartCutInController
+
+# Scenario parameters (as sampled by OneCarHighwayEnv) followed by controller parameters
+SCENARIO_COLUMNS = ['distance', 'bv_speed', 'av_speed', 'lane_offset']
+CONTROLLER_COLUMNS = ['max_speed', 'overtake_distance']
+FEATURE_COLUMNS = SCENARIO_COLUMNS + CONTROLLER_COLUMNS
+OUTCOME_COLUMNS = ['crash', 'min_ttc', 'min_distance']
+
+
+def default_controller_params():
+    """Controller parameters of a freshly created SmartCutInController"""
+    controller = SmartCutInController()
+    return {col: float(getattr(controller, col)) for col in CONTROLLER_COLUMNS}
+
+
+def _attach_controller_params(features, controller_params=None):
+    """Broadcast controller parameters (SmartCutInController defaults updated by controller_params) into features"""
+    params = default_controller_params()
+    if controller_params is not None:
+        params.update(controller_params)
+    for col in CONTROLLER_COLUMNS:
+        features[col] = float(params[col])
+    return features
+
+
+def load_scenario_features(scenario_csv_path, controller_params=None):
+    """
+    Load scenarios with the same column mapping as OneCarHighwayEnv and attach controller parameters
+
+    Parameters:
+    scenario_csv_path: Scenario CSV file (x_diff_abs, xVelocity_cut_in, xVelocity_target, adjusted_laneId_diff)
+    controller_params: Dict of controller parameters, defaults to SmartCutInController defaults
+
+    Returns:
+    features: DataFrame with FEATURE_COLUMNS, one row per scenario in file order
+    """
+    df = pd.read_csv(scenario_csv_path)
+    required_columns = ['x_diff_abs', 'xVelocity_cut_in', 'xVelocity_target', 'adjusted_laneId_diff']
+    for col in required_columns:
+        if col not in df.columns:
+            raise ValueError(f"Missing required column in CSV file: {col}")
+
+    features = pd.DataFrame({
+        'distance': df['x_diff_abs'].astype(float),
+        'bv_speed': df['xVelocity_cut_in'].astype(float).abs(),
+        'av_speed': df['xVelocity_target'].astype(float).abs(),
+        'lane_offset': df['adjusted_laneId_diff'].astype(int),
+    })
+    return _attach_controller_params(features, controller_params)
+
+
+def build_episode_dataset(step_log_path, scenario_csv_path=None, controller_params=None, scenario_offset=1,
+                          distance_tolerance=5.0, lane_width=4.0):
+    """
+    Reduce a campaign step log to one row per episode: scenario features plus episode outcome
+
+    Scenario features are taken from the scenario_* columns written by DataRecorder. Logs without them
+    are matched to scenario_csv_path by index: OneCarHighwayEnv samples scenarios cyclically and its
+    constructor already resets once, so episode i of test_FSM_based_cut_in_vehicle.py ran on scenario
+    (i + scenario_offset) % number_of_scenarios. The match is checked against the step-1 longitudinal gap.
+
+    min_ttc only counts steps where BV and AV share a lane: calculate_ttc_lon also returns a finite TTC
+    in adjacent lanes, which drops to about 0 whenever the BV passes the AV without cutting in.
+
+    Parameters:
+    step_log_path: Step log written by DataRecorder
+    scenario_csv_path: Scenario CSV the campaign was run on (only needed for logs without scenario columns)
+    controller_params: Controller parameters used for the campaign
+    scenario_offset: Scenarios consumed before episode 0 (1 for the reset done by the env constructor)
+    distance_tolerance: Allowed difference [m] between step-1 gap and scenario distance when matching by index
+    lane_width: Lane width [m], vehicles less than half a lane apart laterally count as sharing a lane
+
+    Returns:
+    dataset: DataFrame with FEATURE_COLUMNS and OUTCOME_COLUMNS, one row per episode
+    """
+    log = pd.read_csv(step_log_path)
+    log['crash'] = log['crash'].astype(str).str.strip().str.lower() == 'true'
+    log['ttc_lon'] = pd.to_numeric(log['ttc_lon'], errors='coerce').fillna(np.inf)
+    same_lane = (log['bv_y'] - log['av_y']).abs() < lane_width / 2
+    log.loc[~same_lane, 'ttc_lon'] = np.inf
+
+    episodes = log.groupby('episode').agg(
+        crash=('crash', 'any'),
+        min_ttc=('ttc_lon', 'min'),
+        min_distance=('distance', 'min'),
+    ).reset_index()
+
+    scenario_log_columns = ['scenario_' + col for col in SCENARIO_COLUMNS]
+    # Logs recorded without a scenario have empty scenario_* cells and fall back to index matching
+    if all(col in log.columns for col in scenario_log_columns) and log[scenario_log_columns].notna().all().all():
+        first_steps = log.sort_values('step').groupby('episode').first().loc[episodes['episode']]
+        dataset = pd.DataFrame({col: first_steps['scenario_' + col].to_numpy(dtype=float)
+                                for col in SCENARIO_COLUMNS})
+        dataset['lane_offset'] = dataset['lane_offset'].astype(int)
+        dataset = _attach_controller_params(dataset, controller_params)
+    else:
+        if scenario_csv_path is None:
+            raise ValueError("Step log has no scenario columns, scenario_csv_path is required")
+        scenarios = load_scenario_features(scenario_csv_path, controller_params)
+        scenario_index = (episodes['episode'].to_numpy() + scenario_offset) % len(scenarios)
+        dataset = scenarios.iloc[scenario_index].reset_index(drop=True)
+
+        # Check the episode -> scenario match with the longitudinal gap after the first step
+        first_steps = log.sort_values('step').groupby('episode').first().loc[episodes['episode']]
+        gap = (first_steps['av_x'] - first_steps['bv_x']).to_numpy(dtype=float)
+        mismatch = np.abs(gap - dataset['distance'].to_numpy()) > distance_tolerance
+        if mismatch.any():
+            raise ValueError(f"Episode/scenario mismatch for {mismatch.sum()} of {len(mismatch)} episodes "
+                             f"(scenario_offset={scenario_offset}), check the scenario CSV and offset")
+
+    dataset.insert(0, 'episode', episodes['episode'].to_numpy())
+    for col in OUTCOME_COLUMNS:
+        dataset[col] = episodes[col].to_numpy()
+    return dataset
+
+
+def scenario_ids(dataset):
+    """Integer id shared by all episodes with identical scenario and controller parameters"""
+    return dataset.groupby(FEATURE_COLUMNS, sort=False).ngroup().to_numpy()
+
+
+def split_episodes(dataset, test_fraction=0.2, seed=0):
+    """
+    Split an episode dataset into training and held-out episodes by scenario
+
+    Repeated runs of one scenario (and controller setting) all fall on the same side, so held-out
+    episodes are scenarios the model has never seen.
+    """
+    rng = np.random.default_rng(seed)
+    groups = scenario_ids(dataset)
+    unique_groups = rng.permutation(np.unique(groups))
+    n_test = int(round(len(unique_groups) * test_fraction))
+    test_mask = np.isin(groups, unique_groups[:n_test])
+    return dataset[~test_mask], dataset[test_mask]
+
+
+class SurrogateOutcomeModel:
+    """
+    k-nearest-neighbour surrogate of the simulated episode outcome
+
+    Predictions are the mean over the k most similar stored episodes (standardized feature space) and
+    uncertainties are the spread over those neighbours. The mean distance to the nearest distinct stored
+    scenarios is reported as novelty, so scenarios far from every stored one are flagged for simulation.
+    """
+
+    def __init__(self, n_neighbors=15, critical_ttc=2.0, ttc_cap=20.0, batch_size=1024):
+        self.n_neighbors = n_neighbors
+        self.critical_ttc = critical_ttc     # Episodes with min TTC below this (or a crash) are critical
+        self.ttc_cap = ttc_cap               # TTC is clipped to [0, ttc_cap] (negative while boxes overlap)
+        self.batch_size = batch_size         # Query rows per distance matrix, bounds memory use
+
+        self._mean = None
+        self._scale = None
+        self._x = None
+        self._y = None
+        self._unique_x = None
+        self._novelty_k = None
+        self.novelty_threshold = None
+
+    def _clip_ttc(self, dataset):
+        return np.clip(dataset['min_ttc'].to_numpy(dtype=float), 0.0, self.ttc_cap)
+
+    def _targets(self, dataset):
+        crash = dataset['crash'].to_numpy(dtype=bool)
+        min_ttc = self._clip_ttc(dataset)
+        critical = crash | (min_ttc <= self.critical_ttc)
+        return np.column_stack([
+            crash.astype(float),
+            critical.astype(float),
+            np.log1p(min_ttc),
+            dataset['min_distance'].to_numpy(dtype=float),
+        ])
+
+    def _transform(self, features):
+        x = features[FEATURE_COLUMNS].to_numpy(dtype=float)
+        return (x - self._mean) / self._scale
+
+    def _neighbors(self, x, reference, k, exclude_self=False):
+        """Indices of and mean distance to the k nearest reference rows, computed batch by batch"""
+        train_sq = np.einsum('ij,ij->i', reference, reference)
+        indices = np.empty((len(x), k), dtype=int)
+        novelty = np.empty(len(x))
+
+        for start in range(0, len(x), self.batch_size):
+            batch = x[start:start + self.batch_size]
+            sq_dist = (np.einsum('ij,ij->i', batch, batch)[:, None] + train_sq[None, :]
+                       - 2.0 * batch @ reference.T)
+            np.maximum(sq_dist, 0.0, out=sq_dist)
+            if exclude_self:
+                rows = np.arange(len(batch))
+                sq_dist[rows, start + rows] = np.inf
+
+            nearest = np.argpartition(sq_dist, k - 1, axis=1)[:, :k]
+            indices[start:start + len(batch)] = nearest
+            novelty[start:start + len(batch)] = np.sqrt(np.take_along_axis(sq_dist, nearest, axis=1)).mean(axis=1)
+
+        return indices, novelty
+
+    def fit(self, dataset, novelty_quantile=0.95):
+        """
+        Store training episodes and calibrate the novelty threshold
+
+        Parameters:
+        dataset: Episode dataset from build_episode_dataset (several campaigns may be concatenated)
+        novelty_quantile: Quantile of leave-one-out novelty over distinct training scenarios above which
+                          a scenario counts as unseen
+        """
+        x = dataset[FEATURE_COLUMNS].to_numpy(dtype=float)
+        unique_x = np.unique(x, axis=0)
+        if len(unique_x) < 2:
+            raise ValueError("At least two distinct scenarios are required to fit the surrogate model")
+
+        self._mean = x.mean(axis=0)
+        self._scale = x.std(axis=0)
+        self._scale[self._scale == 0] = 1.0   # Constant features (e.g. a single controller setting)
+        self._x = (x - self._mean) / self._scale
+        self._y = self._targets(dataset)
+
+        # Repeated runs of one scenario would give zero leave-one-out novelty, so calibrate on distinct scenarios
+        self._unique_x = (unique_x - self._mean) / self._scale
+        self._novelty_k = min(self.n_neighbors, len(self._unique_x) - 1)
+        _, novelty = self._neighbors(self._unique_x, self._unique_x, self._novelty_k, exclude_self=True)
+        self.novelty_threshold = float(np.quantile(novelty, novelty_quantile))
+        if self.novelty_threshold <= 0:
+            raise ValueError("Novelty threshold collapsed to zero, training scenarios are not distinct")
+        return self
+
+    def predict(self, features):
+        """
+        Predict episode outcomes and their uncertainty for a batch of scenarios
+
+        Parameters:
+        features: DataFrame with FEATURE_COLUMNS
+
+        Returns:
+        prediction: DataFrame with crash / critical probabilities, min TTC and min distance estimates,
+                    their neighbour standard deviations and the novelty of each scenario
+        """
+        if self._x is None:
+            raise RuntimeError("Surrogate model is not fitted")
+
+        x = self._transform(features)
+        indices, _ = self._neighbors(x, self._x, min(self.n_neighbors, len(self._x)))
+        _, novelty = self._neighbors(x, self._unique_x, self._novelty_k)
+        neighbor_y = self._y[indices]                 # (batch, k, targets)
+        mean = neighbor_y.mean(axis=1)
+        std = neighbor_y.std(axis=1)
+
+        # TTC is averaged in log space, its spread is reported back in seconds
+        ttc_samples = np.expm1(neighbor_y[:, :, 2])
+
+        return pd.DataFrame({
+            'crash_prob': mean[:, 0],
+            'critical_prob': mean[:, 1],
+            'critical_std': std[:, 1],
+            'min_ttc': np.expm1(mean[:, 2]),
+            'min_ttc_std': ttc_samples.std(axis=1),
+            'min_distance': mean[:, 3],
+            'min_distance_std': std[:, 3],
+            'novelty': novelty,
+        }, index=features.index)
+
+    def screen(self, features, critical_threshold=0.5, max_critical_std=0.3):
+        """
+        Decide which scenarios still need full simulation
+
+        A scenario is simulated if it is predicted critical, if its neighbours disagree on the outcome
+        (critical_std >= max_critical_std) or if it lies outside the stored episodes (novelty above threshold).
+
+        Returns:
+        prediction: Output of predict with boolean 'predicted_critical', 'uncertain' and 'simulate' columns
+        """
+        prediction = self.predict(features)
+        prediction['predicted_critical'] = prediction['critical_prob'] >= critical_threshold
+        prediction['uncertain'] = ((prediction['critical_std'] >= max_critical_std)
+                                   | (prediction['novelty'] > self.novelty_threshold))
+        prediction['simulate'] = prediction['predicted_critical'] | prediction['uncertain']
+        return prediction
+
+    def evaluate(self, dataset, critical_threshold=0.5, max_critical_std=0.3):
+        """
+        Score the surrogate on held-out episodes
+
+        Returns:
+        metrics: Precision / recall of the critical classifier, recall of the screening stage (critical
+                 episodes that would still be simulated), simulated fraction and regression errors
+        """
+        prediction = self.screen(dataset, critical_threshold, max_critical_std)
+        actual = self._targets(dataset)[:, 1].astype(bool)
+        predicted = prediction['predicted_critical'].to_numpy()
+        simulate = prediction['simulate'].to_numpy()
+
+        true_positive = np.sum(predicted & actual)
+        min_ttc = self._clip_ttc(dataset)
+
+        return {
+            'episodes': len(dataset),
+            'critical_episodes': int(actual.sum()),
+            'precision': float(true_positive / predicted.sum()) if predicted.any() else float('nan'),
+            'recall': float(true_positive / actual.sum()) if actual.any() else float('nan'),
+            'screening_recall': float(np.sum(simulate & actual) / actual.sum()) if actual.any() else float('nan'),
+            'simulated_fraction': float(simulate.mean()),
+            'min_ttc_mae': float(np.mean(np.abs(prediction['min_ttc'].to_numpy() - min_ttc))),
+            'min_distance_mae': float(np.mean(np.abs(prediction['min_distance'].to_numpy()
+                                                     - dataset['min_distance'].to_numpy(dtype=float)))),
+        }
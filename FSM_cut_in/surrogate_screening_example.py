@@ -0,0 +1,37 @@
+"""surrogate pre-screening example"""
+
+import pandas as pd
+from surrogate_screener import (SurrogateOutcomeModel, build_episode_dataset, load_scenario_features,
+                                split_episodes)
+
+# Stored campaigns: (step log, scenario CSV the campaign was run on, controller parameters)
+# test_FSM_based_cut_in_vehicle.py writes each campaign to a timestamped subdirectory,
+# e.g. ./output/cutin_fsm_testing_logs/<time>/testing_log_<time>/step_log_<time>.csv
+campaigns = [
+    ('./output/cutin_fsm_testing_logs/step_log.csv', './output/merged_all_scenarios.csv',
+     {'max_speed': 36.0, 'overtake_distance': 5.0}),
+]
+
+# New scenarios to be screened
+new_scenario_csv_path = './output/new_scenarios.csv'
+screened_csv_path = './output/screened_scenarios.csv'
+
+# 1. Build episode dataset from all campaigns
+dataset = pd.concat([build_episode_dataset(log_path, scenario_path, params)
+                     for log_path, scenario_path, params in campaigns], ignore_index=True)
+
+# 2. Fit on training episodes and report precision/recall on held-out episodes
+train_set, test_set = split_episodes(dataset, test_fraction=0.2, seed=0)
+model = SurrogateOutcomeModel(n_neighbors=15, critical_ttc=2.0).fit(train_set)
+for name, value in model.evaluate(test_set).items():
+    print(f"{name}: {value}")
+
+# 3. Refit on all episodes and screen the new scenarios
+model.fit(dataset)
+features = load_scenario_features(new_scenario_csv_path, campaigns[0][2])
+prediction = model.screen(features)
+print(f"Scenarios sent to simulation: {prediction['simulate'].sum()} / {len(prediction)}")
+
+# 4. Keep only scenarios that need full simulation, in a CSV OneCarHighwayEnv can load
+scenarios = pd.read_csv(new_scenario_csv_path)
+scenarios[prediction['simulate'].to_numpy()].to_csv(screened_csv_path, index=False)
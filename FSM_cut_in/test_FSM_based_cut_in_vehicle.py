@@ -63,7 +63,7 @@ for i in range(748):
                                     f"{bv.speed:.6f}", f"{np.degrees(bv.heading):.6f}",
                                     f"{acceleration:.6f}", f"{np.degrees(steering):.6f}",
                                      f"{av.position[0]:.6f}", f"{av.position[1]:.6f}", f"{av.speed:.6f}",
-                                     ttc_lon, bv.crashed, f"{distance:.6f}"
+                                     ttc_lon, bv.crashed, f"{distance:.6f}", test_env.current_sample
                                      )
 
         if done or truncated:
@@ -0,0 +1,172 @@
+"""Synthetic-data checks for the surrogate outcome model"""
+
+import csv
+import numpy as np
+import pandas as pd
+import pytest
+from data_recorder import DataRecorder
+from surrogate_screener import SurrogateOutcomeModel, build_episode_dataset, split_episodes
+
+LOG_COLUMNS = ["episode", "step", "bv_x", "bv_y", "bv_speed", "bv_heading", "bv_acceleration", "bv_steering",
+               "av_x", "av_y", "av_speed", "ttc_lon", "crash", "distance"]
+SCENARIO_LOG_COLUMNS = ["scenario_distance", "scenario_bv_speed", "scenario_av_speed", "scenario_lane_offset"]
+
+
+def make_step_log(path, episodes, with_scenario=True):
+    """episodes: list of (scenario distance, [(ttc_lon, crash, distance[, bv_y]), ...]) in episode order"""
+    rows = []
+    for episode, (scenario_distance, steps) in enumerate(episodes):
+        for step, (ttc_lon, crash, distance, *bv_y) in enumerate(steps, start=1):
+            # AV drives at y = 0, BV shares its lane unless bv_y is given
+            row = [episode, step, 0.0, bv_y[0] if bv_y else 0.0, 30.0, 0.0, 0.0, 0.0, scenario_distance, 0.0, 25.0,
+                   ttc_lon, crash, distance]
+            if with_scenario:
+                row += [scenario_distance, 30.0, 25.0, -1]
+            rows.append(row)
+    columns = LOG_COLUMNS + (SCENARIO_LOG_COLUMNS if with_scenario else [])
+    pd.DataFrame(rows, columns=columns).to_csv(path, index=False)
+
+
+def make_scenario_csv(path, distances):
+    pd.DataFrame({
+        'x_diff_abs': distances,
+        'xVelocity_cut_in': [-30.0] * len(distances),
+        'xVelocity_target': [-25.0] * len(distances),
+        'adjusted_laneId_diff': [-1] * len(distances),
+    }).to_csv(path, index=False)
+
+
+def make_dataset(distances, crash, min_ttc):
+    n = len(distances)
+    return pd.DataFrame({
+        'distance': np.asarray(distances, dtype=float),
+        'bv_speed': np.full(n, 30.0),
+        'av_speed': np.full(n, 25.0),
+        'lane_offset': np.full(n, -1),
+        'max_speed': np.full(n, 36.0),
+        'overtake_distance': np.full(n, 5.0),
+        'crash': np.asarray(crash, dtype=bool),
+        'min_ttc': np.asarray(min_ttc, dtype=float),
+        'min_distance': np.full(n, 10.0),
+    })
+
+
+def test_build_episode_dataset_from_logged_scenarios(tmp_path):
+    log_path = tmp_path / "step_log.csv"
+    make_step_log(log_path, [
+        (20.0, [(3.0, False, 20.0), (-2.5, True, 4.0)]),
+        (40.0, [("inf", False, 40.0), (6.0, False, 35.0)]),
+    ])
+
+    dataset = build_episode_dataset(log_path, controller_params={'max_speed': 34.0})
+
+    assert dataset['episode'].tolist() == [0, 1]
+    assert dataset['distance'].tolist() == [20.0, 40.0]
+    assert dataset['crash'].tolist() == [True, False]
+    assert dataset['min_ttc'].tolist() == [-2.5, 6.0]
+    assert dataset['min_distance'].tolist() == [4.0, 35.0]
+    assert dataset['max_speed'].tolist() == [34.0, 34.0]
+    assert dataset['overtake_distance'].tolist() == [5.0, 5.0]
+
+
+def test_build_episode_dataset_index_matching_uses_offset(tmp_path):
+    scenario_path = tmp_path / "scenarios.csv"
+    make_scenario_csv(scenario_path, [10.0, 30.0, 50.0])
+
+    # The env constructor consumes scenario 0, so episode 0 runs on scenario 1
+    log_path = tmp_path / "step_log.csv"
+    make_step_log(log_path, [(30.0, [(5.0, False, 30.0)]),
+                             (50.0, [(5.0, False, 50.0)]),
+                             (10.0, [(1.0, True, 10.0)])], with_scenario=False)
+
+    dataset = build_episode_dataset(log_path, scenario_path)
+    assert dataset['distance'].tolist() == [30.0, 50.0, 10.0]
+    assert dataset['crash'].tolist() == [False, False, True]
+
+    with pytest.raises(ValueError, match="mismatch"):
+        build_episode_dataset(log_path, scenario_path, scenario_offset=0)
+
+
+def test_adjacent_lane_pass_is_not_critical(tmp_path):
+    log_path = tmp_path / "step_log.csv"
+    # BV passes the AV in the adjacent lane (TTC drops to 0) and never cuts in
+    make_step_log(log_path, [
+        (20.0, [(4.0, False, 20.5, 4.0), (0.0, False, 4.0, 4.0), (np.inf, False, 12.0, 4.0)]),
+    ])
+
+    dataset = build_episode_dataset(log_path)
+    assert dataset['min_ttc'].tolist() == [np.inf]
+
+    model = SurrogateOutcomeModel()
+    assert model._targets(dataset)[:, 1].tolist() == [0.0]
+
+
+def test_recorder_without_scenario_falls_back_to_index_matching(tmp_path):
+    scenario_path = tmp_path / "scenarios.csv"
+    make_scenario_csv(scenario_path, [10.0, 30.0])
+
+    log_path = tmp_path / "step_log.csv"
+    with open(log_path, mode='w', newline='', encoding='utf-8') as log_file:
+        recorder = DataRecorder(csv.writer(log_file))
+        recorder.init_testing_log()
+        recorder.record_testing_data(0, 1, 0.0, 0.0, 30.0, 0.0, 0.0, 0.0, 30.0, 0.0, 25.0, 6.0, False, 30.0)
+        recorder.record_testing_data(1, 1, 0.0, 0.0, 30.0, 0.0, 0.0, 0.0, 10.0, 0.0, 25.0, 2.0, False, 10.0)
+
+    dataset = build_episode_dataset(log_path, scenario_path)
+    assert dataset['distance'].tolist() == [30.0, 10.0]
+    assert dataset['min_ttc'].tolist() == [6.0, 2.0]
+
+
+def test_split_episodes_keeps_repeated_scenarios_together():
+    distances = np.repeat(np.arange(10.0), 4)
+    dataset = make_dataset(distances, np.zeros(40), np.full(40, 5.0))
+
+    train_set, test_set = split_episodes(dataset, test_fraction=0.3, seed=1)
+
+    assert len(train_set) + len(test_set) == 40
+    assert set(train_set['distance']).isdisjoint(set(test_set['distance']))
+    assert test_set['distance'].nunique() == 3
+
+
+def test_leave_one_out_excludes_self_across_batches():
+    model = SurrogateOutcomeModel(batch_size=2)
+    x = np.arange(7.0)[:, None]
+    indices, novelty = model._neighbors(x, x, 2, exclude_self=True)
+
+    assert not np.any(indices == np.arange(7)[:, None])
+    assert np.all(novelty > 0)
+
+
+def test_novelty_threshold_ignores_repeated_runs():
+    distances = np.repeat(np.arange(10.0), 20)
+    dataset = make_dataset(distances, np.zeros(200), np.full(200, 5.0))
+
+    model = SurrogateOutcomeModel(n_neighbors=3).fit(dataset)
+
+    assert model.novelty_threshold > 0
+    prediction = model.screen(make_dataset([4.0, 500.0], [False, False], [5.0, 5.0]))
+    assert prediction['uncertain'].tolist() == [False, True]
+    assert prediction['simulate'].tolist() == [False, True]
+
+
+def test_evaluate_precision_recall():
+    # Two clusters: critical cut-ins at short distance (negative TTC while overlapping), safe ones far away
+    train_distances = list(np.arange(10.0)) + list(np.arange(100.0, 110.0))
+    train_set = make_dataset(train_distances, [True] * 10 + [False] * 10, [-3.0] * 10 + [np.inf] * 10)
+    model = SurrogateOutcomeModel(n_neighbors=3).fit(train_set)
+
+    # TP, FN, FP, TN
+    test_set = make_dataset([1.5, 101.5, 2.5, 105.5], [True, False, False, False], [-1.5, 1.0, 8.0, np.inf])
+    metrics = model.evaluate(test_set)
+
+    assert metrics['critical_episodes'] == 2
+    assert metrics['precision'] == pytest.approx(0.5)
+    assert metrics['recall'] == pytest.approx(0.5)
+    assert metrics['screening_recall'] == pytest.approx(0.5)
+    assert metrics['simulated_fraction'] == pytest.approx(0.5)
+    assert np.isfinite(metrics['min_ttc_mae'])
+
+    prediction = model.predict(test_set)
+    assert prediction['min_ttc'].iloc[0] == pytest.approx(0.0)
+    assert prediction[['crash_prob', 'critical_prob']].iloc[0].tolist() == [1.0, 1.0]
+    assert list(prediction.index) == list(test_set.index)